@@ -1,5 +1,5 @@
 # User configuration
-username = ""
+usernames = []
 quality = "best"
 check_interval = 15
 wait_before_processing = 1800 
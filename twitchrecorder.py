@@ -1,56 +1,245 @@
+import asyncio
 import datetime
 import enum
 import getopt
+import json
 import logging
 import os
-import subprocess
 import sys
 import shutil
+import tempfile
 import time
-import threading
 import requests
+from requests.adapters import HTTPAdapter
 import re
 
 import config
 
-class TwitchResponseStatus(enum.Enum):
+logger = logging.getLogger(__name__)
+
+# anything that is not alphanumeric, space, "-", "_" or "."
+_BAD_FILENAME_CHARS = re.compile(r"[^\w .\-]")
+
+def _config_usernames():
+    usernames = getattr(config, "usernames", None)
+    if usernames is None:
+        # configs from before multi-channel support define a single username
+        usernames = getattr(config, "username", "")
+    if isinstance(usernames, str):
+        usernames = [usernames]
+    return [username.strip().lower() for username in usernames if username.strip()]
+
+class TwitchResponseStatus(enum.IntEnum):
     ONLINE = 0
     OFFLINE = 1
     NOT_FOUND = 2
     UNAUTHORIZED = 3
     ERROR = 4
 
+class StreamCheckError(Exception):
+    """Raised by the status loop when it gives up and the script should restart."""
+
+class AdaptivePoller:
+    """Picks the poll interval from an hour-of-week histogram of past go-live times.
+
+    Hours in which channels usually go live are polled faster than ``base_interval``,
+    dead hours slower, clamped to ``[min_interval, max_interval]``. Until
+    ``min_history_days`` of history exist ``base_interval`` is used as is.
+    """
+    HOURS_PER_WEEK = 7 * 24
+
+    def __init__(self, history_path, base_interval, min_interval=5, max_interval=300, min_history_days=7,
+                 max_history=1000):
+        self.history_path = history_path
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.min_history_days = min_history_days
+        self.max_history = max_history
+        self.history = []
+        # go-live counts per hour of the week, kept in sync with history
+        self.histogram = [0] * self.HOURS_PER_WEEK
+        self._load_history()
+
+    def _load_history(self):
+        try:
+            with open(self.history_path) as f:
+                history = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(history, list) or not all(
+                isinstance(timestamp, (int, float)) and not isinstance(timestamp, bool) for timestamp in history):
+            logger.warning("ignoring invalid go-live history in %s", self.history_path)
+            return
+        history = history[-self.max_history:]
+        try:
+            hours = [self._hour_of_week(timestamp) for timestamp in history]
+        except (OverflowError, OSError, ValueError):
+            logger.warning("ignoring invalid go-live history in %s", self.history_path)
+            return
+        self.history = history
+        for hour in hours:
+            self.histogram[hour] += 1
+
+    @staticmethod
+    def _hour_of_week(timestamp):
+        t = datetime.datetime.fromtimestamp(timestamp)
+        return t.weekday() * 24 + t.hour
+
+    def record_golive(self, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        self.history.append(timestamp)
+        self.histogram[self._hour_of_week(timestamp)] += 1
+        while len(self.history) > self.max_history:
+            self.histogram[self._hour_of_week(self.history.pop(0))] -= 1
+        try:
+            with open(self.history_path, "w") as f:
+                json.dump(self.history, f)
+        except OSError as e:
+            logger.error(e)
+
+    def interval(self, now=None):
+        now = time.time() if now is None else now
+        if not self.history or now - self.history[0] < self.min_history_days * 86400:
+            return self.base_interval
+
+        count = self.histogram[self._hour_of_week(now)]
+        # laplace-smoothed probability of a go-live falling into the current hour of the week
+        p = (count + 1) / (len(self.history) + self.HOURS_PER_WEEK)
+        # a uniform distribution (p = 1/168) maps to base_interval
+        interval = self.base_interval / (self.HOURS_PER_WEEK * p)
+        return max(self.min_interval, min(self.max_interval, interval))
+
 class TwitchRecorder:
     def __init__(self):
         # global configuration
         self.ffmpeg_path = "ffmpeg"
         self.disable_ffmpeg = False
-        self.refresh = 15
+        # created in _main so it binds to the running event loop
+        self.processing_semaphore = None
+        self.refresh = config.check_interval
+        self.refresh_while_recording = config.check_interval_while_awaiting_processing
+        self.consecutive_errors = 0
+        self.max_consecutive_errors = 5
         self.root_path = config.root_path
+        self.poll_schedule = AdaptivePoller(os.path.join(self.root_path, ".golive_history.json"), self.refresh)
 
         # user configuration
-        self.username = config.username
+        self.usernames = _config_usernames()
         self.quality = "best"
 
         # twitch configuration
         self.client_id = config.client_id
         self.client_secret = config.client_secret
-        self.token_url = "https://id.twitch.tv/oauth2/token?client_id=" + self.client_id + "&client_secret=" \
-                         + self.client_secret + "&grant_type=client_credentials"
+        self.token_url = "https://id.twitch.tv/oauth2/token"
+        self._auth_params = {"client_id": self.client_id, "client_secret": self.client_secret,
+                             "grant_type": "client_credentials"}
         self.url = "https://api.twitch.tv/helix/streams"
-        self.access_token = self.fetch_access_token()
-        self.stream_start_time = None
+        self._streams_url = self.url
+        # reuse connections across polls instead of a new TLS handshake per request
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=4)
+        self.session.mount("https://", adapter)
+        self.token_expires_at = 0
+        self.token_refresh_failures = 0
+        self.max_token_refresh_failures = 3
+        self._token_cache_path = os.path.join(self.root_path, ".twitch_token.json")
+        self.access_token = self._load_cached_access_token() or self._request_access_token()
+        self._update_headers()
+
+        # per-channel stream state, keyed by user login
+        self.online_set = set()
+        # channels already live on the first poll are not real go-live events
+        self._first_poll = True
+        self.active_recordings = {}
+        self.recording_processes = {}
+        # consecutive polls a live channel was missing from the helix response
+        self.offline_polls = {}
+        self.max_offline_polls = 3
+        # last helix response per batch of user logins: (etag, raw body, parsed data)
+        self._streams_cache = {}
 
         # Discord webhook configuration
         self.discord_webhook_url = config.discord_webhook_url
+        # created in _main so it binds to the running event loop
+        self.discord_queue = None
 
-    def fetch_access_token(self):
-        token_response = requests.post(self.token_url, timeout=15)
+        self._status_dispatch = {
+            TwitchResponseStatus.ONLINE: self._on_online,
+            TwitchResponseStatus.OFFLINE: self._on_offline,
+            TwitchResponseStatus.NOT_FOUND: self._on_not_found,
+            TwitchResponseStatus.UNAUTHORIZED: self._on_unauthorized,
+            TwitchResponseStatus.ERROR: self._on_error,
+        }
+
+    def _request_access_token(self):
+        token_response = self.session.post(self.token_url, data=self._auth_params, timeout=15)
         token_response.raise_for_status()
         token = token_response.json()
+        self.token_expires_at = time.time() + token["expires_in"]
+        self._save_cached_access_token(token["access_token"], self.token_expires_at)
         return token["access_token"]
 
+    def _load_cached_access_token(self):
+        try:
+            with open(self._token_cache_path) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # only reuse tokens issued for the configured client that are not about to expire
+        if cached.get("client_id") == self.client_id and cached.get("expires_at", 0) > time.time() + 60:
+            self.token_expires_at = cached["expires_at"]
+            return cached.get("access_token")
+        return None
+
+    def _save_cached_access_token(self, access_token, expires_at):
+        try:
+            os.makedirs(self.root_path, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.root_path)
+            try:
+                os.chmod(tmp_path, 0o600)
+                with os.fdopen(fd, "w") as f:
+                    json.dump({"client_id": self.client_id, "access_token": access_token,
+                               "expires_at": expires_at}, f)
+                os.replace(tmp_path, self._token_cache_path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        except OSError as e:
+            logger.error(e)
+
+    def _clear_cached_access_token(self):
+        try:
+            os.remove(self._token_cache_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(e)
+
+    def _update_headers(self):
+        self._headers = {"Client-ID": self.client_id, "Authorization": "Bearer " + self.access_token}
+
+    async def fetch_access_token(self):
+        access_token = await asyncio.to_thread(self._request_access_token)
+        self.access_token = access_token
+        self._update_headers()
+        return access_token
+
+    async def refresh_access_token(self):
+        try:
+            await self.fetch_access_token()
+            self.token_refresh_failures = 0
+        except requests.exceptions.RequestException as e:
+            self.token_refresh_failures += 1
+            logger.error("failed to refresh access token: %s", e)
+            # only notify once refreshing keeps failing, not on every token rotation
+            if self.token_refresh_failures == self.max_token_refresh_failures:
+                self.send_stream_failure_notification(
+                    f"Failed to refresh access token {self.token_refresh_failures} times in a row")
+
     def send_discord_message(self, title, description, status_color):
+        if not self.discord_webhook_url:
+            return
         payload = {
             "embeds": [
                 {
@@ -60,137 +249,269 @@ class TwitchRecorder:
                 }
             ]
         }
-        requests.post(self.discord_webhook_url, json=payload)
+        try:
+            self.discord_queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            logger.warning("discord notification queue is full, dropping \"%s\"", title)
+
+    async def process_discord_messages(self):
+        while True:
+            payload = await self.discord_queue.get()
+            try:
+                r = await asyncio.to_thread(self.session.post, self.discord_webhook_url, json=payload, timeout=5)
+                r.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                logger.error("failed to send discord notification: %s", e)
+            finally:
+                self.discord_queue.task_done()
 
-    def send_stream_start_notification(self):
-        message = f"Stream for [{self.username}](https://twitch.tv/{self.username}) has started!"
+    def send_stream_start_notification(self, username):
+        message = f"Stream for [{username}](https://twitch.tv/{username}) has started!"
         self.send_discord_message("Stream Started", message, 65280)  # Green color
 
-    def send_stream_stop_notification(self):
-        message = f"Stream for [{self.username}](https://twitch.tv/{self.username}) has stopped."
+    def send_stream_stop_notification(self, username):
+        message = f"Stream for [{username}](https://twitch.tv/{username}) has stopped."
         self.send_discord_message("Stream Stopped", message, 16711680)  # Red color
 
     def send_stream_failure_notification(self, error_message):
-        message = f"Stream for [{self.username}](https://twitch.tv/{self.username}) has encountered an error:\n{error_message}"
+        message = f"Recording {', '.join(self.usernames)} has encountered an error:\n{error_message}"
         self.send_discord_message("Stream Error", message, 16776960)  # Yellow color
 
     def run(self):
-        # Start a thread for checking stream status
-        stream_check_thread = threading.Thread(target=self.check_stream_continuously)
-        stream_check_thread.start()
+        try:
+            asyncio.run(self._main())
+        except StreamCheckError:
+            # already logged and notified by the status loop
+            sys.exit(1)
 
-        # Process recorded files
-        self.process_recorded_files()
+    async def _main(self):
+        # bound concurrent ffmpeg runs so parallel post-processing doesn't thrash the disk
+        self.processing_semaphore = asyncio.Semaphore(min(4, os.cpu_count() or 1))
+        # bounded so a Discord outage can't buffer notifications without limit
+        self.discord_queue = asyncio.Queue(maxsize=16)
+        discord_task = asyncio.create_task(self.process_discord_messages())
+        processing_task = asyncio.create_task(self.process_recorded_files())
+        try:
+            # check stream status while processing previously recorded files
+            await self.check_stream_continuously()
+        except StreamCheckError:
+            # let leftover files finish processing so no half-written output is left behind
+            await processing_task
+            # give queued notifications, e.g. the error that ended the loop, a chance to go out
+            try:
+                await asyncio.wait_for(self.discord_queue.join(), 5)
+            except asyncio.TimeoutError:
+                logger.warning("timed out sending pending discord notifications")
+            raise
+        finally:
+            # on cancellation (e.g. ctrl+c) don't wait for queued ffmpeg runs
+            processing_task.cancel()
+            discord_task.cancel()
 
-    def check_stream_continuously(self):
+    async def check_stream_continuously(self):
+        self._next_poll = time.monotonic()
         while True:
-            status, info = self.check_user()
-            if status == TwitchResponseStatus.NOT_FOUND:
-                logging.error("username not found, invalid username or typo")
-                time.sleep(self.refresh)
-            elif status == TwitchResponseStatus.ERROR:
-                error_message = "Unexpected error. Restarting script."
-                logging.error(error_message)
-                self.send_stream_failure_notification(error_message)
-                time.sleep(2)
-                sys.exit()
-            elif status == TwitchResponseStatus.OFFLINE:
-                if self.stream_start_time:
-                    self.send_stream_stop_notification()
-                    self.stream_start_time = None
-                logging.info("%s currently offline, checking again in %s seconds", self.username, self.refresh)
-                time.sleep(self.refresh)
-            elif status == TwitchResponseStatus.UNAUTHORIZED:
-                error_message = "Unauthorized, will attempt to log back in immediately"
-                logging.info(error_message)
-                self.access_token = self.fetch_access_token()
-                self.send_stream_failure_notification(error_message)
-            elif status == TwitchResponseStatus.ONLINE:
-                self.send_stream_start_notification()
-                logging.info("%s online, stream recording in session", self.username)
-
-                channels = info["data"]
-                channel = next(iter(channels), None)
-                filename = self.username + " - " + datetime.datetime.now() \
-                    .strftime("%y%m%d %Hh%Mm%Ss") + " - " + channel.get("title") + ".mp4"
-
-                # clean filename from unnecessary characters
-                filename = "".join(x for x in filename if x.isalnum() or x in [" ", "-", "_", "."])
-
-                recorded_filename = os.path.join(self.root_path, "recorded", self.username, filename)
-                processed_filename = os.path.join(self.root_path, "processed", self.username, filename)
-
-                # start streamlink process
-                subprocess.call(
-                    ["streamlink", "--twitch-disable-ads", "twitch.tv/" + self.username, self.quality,
-                     "-o", recorded_filename])
-
-                logging.info("recording stream is done, processing video file")
-                if os.path.exists(recorded_filename) is True:
-                    self.process_recorded_file(recorded_filename, processed_filename)
-                else:
-                    logging.info("skip fixing, file not found")
-
-                logging.info("processing is done, going back to checking...")
-                time.sleep(self.refresh)
-
-    def process_recorded_files(self):
+            # refresh the token before it expires instead of waiting for a 401
+            if time.time() > self.token_expires_at - 300:
+                logger.info("access token is about to expire, refreshing")
+                await self.refresh_access_token()
+            status, info = await self.check_user()
+            if status != TwitchResponseStatus.ERROR:
+                self.consecutive_errors = 0
+            await self._status_dispatch.get(status, self._on_error)(info)
+
+    async def _on_not_found(self, info):
+        logger.error("username not found, invalid username or typo")
+        await self.wait_for_next_poll(self.refresh)
+
+    async def _on_error(self, info):
+        self.consecutive_errors += 1
+        # don't cut running recordings short because of a transient API failure
+        if self.active_recordings and self.consecutive_errors < self.max_consecutive_errors:
+            logger.error("unexpected error while recording (%s in a row), checking again in %s seconds",
+                         self.consecutive_errors, self.refresh)
+            await self.wait_for_next_poll(self.refresh)
+            return
+        error_message = "Unexpected error. Restarting script."
+        logger.error(error_message)
+        self.send_stream_failure_notification(error_message)
+        raise StreamCheckError(error_message)
+
+    async def _on_offline(self, info):
+        await self.update_channels(info["data"])
+        interval = self.poll_interval()
+        # fires on every poll, skip building the arguments when info is disabled
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("%s currently offline, checking again in %s seconds",
+                        ", ".join(self.usernames), round(interval))
+        await self.wait_for_next_poll(interval)
+
+    async def _on_unauthorized(self, info):
+        logger.info("unauthorized, will attempt to log back in immediately")
+        # the cached token was rejected, don't load it again after a restart
+        self._clear_cached_access_token()
+        await self.refresh_access_token()
+        if self.token_refresh_failures:
+            await self.wait_for_next_poll(self.refresh)
+
+    async def _on_online(self, info):
+        await self.update_channels(info["data"])
+        await self.wait_for_next_poll(self.poll_interval())
+
+    async def wait_for_next_poll(self, interval):
+        # schedule against the monotonic clock so the time spent polling doesn't add up
+        self._next_poll += interval
+        now = time.monotonic()
+        if self._next_poll < now:
+            # overran, poll again right away without trying to catch up on missed ticks
+            self._next_poll = now
+        await asyncio.sleep(self._next_poll - now)
+
+    def poll_interval(self):
+        # keep polling quickly while streamlink runs or a channel might have gone offline,
+        # so going offline is noticed without waiting for the recording to end
+        if self.recording_processes or self.offline_polls:
+            return self.refresh_while_recording
+        return self.poll_schedule.interval()
+
+    async def update_channels(self, channels):
+        live = {channel["user_login"].lower(): channel for channel in channels}
+
+        for username in self.online_set - live.keys():
+            # a single empty response is not enough to consider the channel offline
+            self.offline_polls[username] = self.offline_polls.get(username, 0) + 1
+            if self.offline_polls[username] < self.max_offline_polls:
+                continue
+            del self.offline_polls[username]
+            self.online_set.discard(username)
+            self.send_stream_stop_notification(username)
+            # stop streamlink right away instead of waiting for its own timeout
+            process = self.recording_processes.get(username)
+            if process is not None and process.returncode is None:
+                logger.info("%s went offline, stopping streamlink", username)
+                process.terminate()
+
+        for username, channel in live.items():
+            self.offline_polls.pop(username, None)
+            if username not in self.online_set:
+                self.online_set.add(username)
+                if not self._first_poll:
+                    self.poll_schedule.record_golive()
+                self.send_stream_start_notification(username)
+            # (re)start recording if streamlink is not running for a live channel
+            if username not in self.active_recordings:
+                self.active_recordings[username] = asyncio.create_task(self.record_stream(username, channel))
+
+        self._first_poll = False
+
+    async def record_stream(self, username, channel):
+        try:
+            logger.info("%s online, stream recording in session", username)
+
+            filename = username + " - " + datetime.datetime.now() \
+                .strftime("%y%m%d %Hh%Mm%Ss") + " - " + channel.get("title") + ".mp4"
+
+            # clean filename from unnecessary characters
+            filename = _BAD_FILENAME_CHARS.sub("", filename)
+
+            recorded_filename = os.path.join(self.root_path, "recorded", username, filename)
+            processed_filename = os.path.join(self.root_path, "processed", username, filename)
+
+            # start streamlink process
+            process = await asyncio.create_subprocess_exec(
+                "streamlink", "--twitch-disable-ads", "twitch.tv/" + username, self.quality,
+                "-o", recorded_filename)
+            self.recording_processes[username] = process
+            try:
+                await process.wait()
+            finally:
+                del self.recording_processes[username]
+
+            logger.info("recording %s is done, processing video file", username)
+            if os.path.exists(recorded_filename) is True:
+                await self.process_recorded_file(recorded_filename, processed_filename)
+            else:
+                logger.info("skip fixing, file not found")
+
+            logger.info("processing %s is done, going back to checking...", username)
+        except Exception as e:
+            # recordings run as background tasks, so nobody else would see this
+            logger.error(e)
+        finally:
+            del self.active_recordings[username]
+
+    async def process_recorded_files(self):
+        await asyncio.gather(*(self.process_recorded_user_files(username) for username in self.usernames))
+
+    async def process_recorded_user_files(self, username):
         # path to recorded stream
-        recorded_path = os.path.join(self.root_path, "recorded", self.username)
+        recorded_path = os.path.join(self.root_path, "recorded", username)
         # path to finished video, errors removed
-        processed_path = os.path.join(self.root_path, "processed", self.username)
+        processed_path = os.path.join(self.root_path, "processed", username)
 
         # create directory for recordedPath and processedPath if not exist
-        if os.path.isdir(recorded_path) is False:
-            os.makedirs(recorded_path)
-        if os.path.isdir(processed_path) is False:
-            os.makedirs(processed_path)
+        os.makedirs(recorded_path, exist_ok=True)
+        os.makedirs(processed_path, exist_ok=True)
 
         try:
-            video_list = [f for f in os.listdir(recorded_path) if os.path.isfile(os.path.join(recorded_path, f))]
+            # DirEntry.is_file() uses the file type from the directory listing, no extra stat per file
+            with os.scandir(recorded_path) as it:
+                video_list = [(e.path, e.name) for e in it if e.is_file()]
             if len(video_list) > 0:
-                logging.info("processing previously recorded files")
-            for f in video_list:
-                recorded_filename = os.path.join(recorded_path, f)
-                processed_filename = os.path.join(processed_path, f)
-                self.process_recorded_file(recorded_filename, processed_filename)
+                logger.info("processing previously recorded files")
+            await asyncio.gather(*(self.process_recorded_file(recorded_filename, os.path.join(processed_path, f))
+                                   for recorded_filename, f in video_list))
         except Exception as e:
-            logging.error(e)
+            logger.error(e)
 
-    def process_recorded_file(self, recorded_filename, processed_filename):
+    async def process_recorded_file(self, recorded_filename, processed_filename):
         if self.disable_ffmpeg:
-            logging.info("moving: %s", recorded_filename)
-            shutil.move(recorded_filename, processed_filename)
+            logger.info("moving: %s", recorded_filename)
+            await asyncio.to_thread(shutil.move, recorded_filename, processed_filename)
         else:
-            logging.info("fixing %s", recorded_filename)
-            self.ffmpeg_copy_and_fix_errors(recorded_filename, processed_filename)
+            logger.info("fixing %s", recorded_filename)
+            await self.ffmpeg_copy_and_fix_errors(recorded_filename, processed_filename)
 
-    def ffmpeg_copy_and_fix_errors(self, recorded_filename, processed_filename):
+    async def ffmpeg_copy_and_fix_errors(self, recorded_filename, processed_filename):
         try:
-            subprocess.call(
-                [self.ffmpeg_path, "-err_detect", "ignore_err", "-i", recorded_filename, "-c", "copy",
-                 processed_filename])
+            async with self.processing_semaphore:
+                # -y overwrites partial output left behind by an interrupted run
+                process = await asyncio.create_subprocess_exec(
+                    self.ffmpeg_path, "-nostdin", "-y", "-err_detect", "ignore_err", "-i", recorded_filename,
+                    "-c", "copy", processed_filename, stdin=asyncio.subprocess.DEVNULL)
+                await process.wait()
+            if process.returncode != 0:
+                logger.error("ffmpeg exited with code %s, keeping %s", process.returncode, recorded_filename)
+                return
             os.remove(recorded_filename)
         except Exception as e:
-            logging.error(e)
+            logger.error(e)
 
-    def check_user(self):
-        info = None
+    async def check_user(self):
+        info = {"data": []}
         status = TwitchResponseStatus.ERROR
         try:
-            headers = {"Client-ID": self.client_id, "Authorization": "Bearer " + self.access_token}
-            r = requests.get(self.url + "?user_login=" + self.username, headers=headers, timeout=15)
-            r.raise_for_status()
-            info = r.json()
-            if info is None or not info["data"]:
+            # helix accepts up to 100 user_login parameters per request
+            for i in range(0, len(self.usernames), 100):
+                batch = tuple(self.usernames[i:i + 100])
+                etag, content, data = self._streams_cache.get(batch, (None, None, None))
+                headers = self._headers
+                if etag:
+                    headers = {**headers, "If-None-Match": etag}
+                r = await asyncio.to_thread(
+                    self.session.get, self._streams_url, params={"user_login": batch}, headers=headers, timeout=15)
+                r.raise_for_status()
+                # skip parsing when the response is unchanged since the previous poll
+                if r.status_code != 304 and r.content != content:
+                    data = r.json()["data"]
+                    self._streams_cache[batch] = (r.headers.get("ETag"), r.content, data)
+                info["data"].extend(data)
+            if not info["data"]:
                 status = TwitchResponseStatus.OFFLINE
             else:
                 status = TwitchResponseStatus.ONLINE
-                # Store stream start time
-                if not self.stream_start_time:
-                    self.stream_start_time = datetime.datetime.utcnow().strftime("%Y%m%d")
         except requests.exceptions.RequestException as e:
-            if e.response:
+            if e.response is not None:
                 if e.response.status_code == 401:
                     status = TwitchResponseStatus.UNAUTHORIZED
                 if e.response.status_code == 404:
@@ -198,10 +519,11 @@ class TwitchRecorder:
         return status, info
 
 def main(argv):
-    twitch_recorder = TwitchRecorder()
-    usage_message = "twitch-recorder.py -u <username> -q <quality>"
-    logging.basicConfig(filename="twitch-recorder.log", level=logging.INFO)
-    logging.getLogger().addHandler(logging.StreamHandler())
+    usage_message = "twitch-recorder.py -u <username>[,<username>...] -q <quality>"
+    logging_level = logging.INFO
+    usernames = None
+    quality = None
+    disable_ffmpeg = False
 
     try:
         opts, args = getopt.getopt(argv, "hu:q:l:", ["username=", "quality=", "log=", "logging=", "disable-ffmpeg"])
@@ -213,18 +535,34 @@ def main(argv):
             print(usage_message)
             sys.exit()
         elif opt in ("-u", "--username"):
-            twitch_recorder.username = arg
+            usernames = [username.strip().lower() for username in arg.split(",") if username.strip()]
         elif opt in ("-q", "--quality"):
-            twitch_recorder.quality = arg
+            quality = arg
         elif opt in ("-l", "--log", "--logging"):
             logging_level = getattr(logging, arg.upper(), None)
             if not isinstance(logging_level, int):
-                raise ValueError("invalid log level: %s" % logging_level)
-            logging.basicConfig(level=logging_level)
-            logging.info("logging configured to %s", arg.upper())
+                raise ValueError("invalid log level: %s" % arg)
         elif opt == "--disable-ffmpeg":
-            twitch_recorder.disable_ffmpeg = True
-            logging.info("ffmpeg disabled")
+            disable_ffmpeg = True
+
+    # basicConfig only takes effect once, so configure file and level together
+    logging.basicConfig(filename="twitch-recorder.log", level=logging_level)
+    logging.getLogger().addHandler(logging.StreamHandler())
+    logger.info("logging configured to %s", logging.getLevelName(logging_level))
+
+    if not (usernames if usernames is not None else _config_usernames()):
+        logger.error("no usernames configured")
+        print(usage_message)
+        sys.exit(2)
+
+    twitch_recorder = TwitchRecorder()
+    if usernames is not None:
+        twitch_recorder.usernames = usernames
+    if quality is not None:
+        twitch_recorder.quality = quality
+    if disable_ffmpeg:
+        twitch_recorder.disable_ffmpeg = True
+        logger.info("ffmpeg disabled")
 
     twitch_recorder.run()
 